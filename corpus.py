@@ -0,0 +1,30 @@
+import os
+import re
+import json
+from typing import List, Optional
+
+# Description corpus shared by the benchmarking tools (loadtest.py,
+# kb_benchmark.py): the README's '####' example questions plus any
+# descriptions found in a JSONL request log.
+
+README_QUESTION = re.compile(r"^####\s+(.*\S)\s*$")
+
+def load_corpus(readme_path: str, log_path: Optional[str]) -> List[str]:
+    """Collect descriptions from the README question list and a JSONL request log."""
+    corpus = []
+    if os.path.exists(readme_path):
+        with open(readme_path, 'r') as f:
+            for line in f:
+                match = README_QUESTION.match(line)
+                if match:
+                    corpus.append(match.group(1))
+    if log_path and os.path.exists(log_path):
+        with open(log_path, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and entry.get("description"):
+                    corpus.append(entry["description"])
+    return corpus
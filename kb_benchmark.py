@@ -0,0 +1,242 @@
+import os
+import re
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from collections import Counter
+from typing import List, Dict
+import numpy as np
+from main import KnowledgeBase, TextAnalysisTool, FEATURE_BOOSTS, config, tokenize, sparse_nbytes
+from corpus import load_corpus
+
+# Knowledge-base scaling benchmark.
+# Generates synthetic pest catalogs of increasing size from the term
+# distributions of pest_knowledge.json, then times each retrieval/scoring
+# stage of TextAnalysisTool on them and tracks memory with tracemalloc.
+#
+#   python kb_benchmark.py --sizes 100 1000 10000 --plot kb_scaling.png
+#   python kb_benchmark.py --precision   # ranking effect of float16/int8 embeddings
+
+LIST_FIELDS = ["crops", "regions", "symptoms", "synonyms"]
+SYMPTOM_MODIFIERS = ["severe", "early", "patchy", "widespread", "scattered"]
+
+def term_pools(base: Dict) -> Dict:
+    """Term frequencies and list-length distributions for each field of the KB schema."""
+    pools = {"terms": {}, "lengths": {}}
+    fields = {
+        **{field: lambda data, field=field: data.get(field, []) for field in LIST_FIELDS},
+        "color": lambda data: data.get("appearance", {}).get("color", []),
+        "size": lambda data: data.get("appearance", {}).get("size", []),
+        **{kind: lambda data, kind=kind: data.get("control_measures", {}).get(kind, [])
+           for kind in ["chemical", "biological", "cultural"]}
+    }
+    for field, values in fields.items():
+        pools["terms"][field] = Counter(term for data in base.values() for term in values(data))
+        pools["lengths"][field] = [len(values(data)) for data in base.values()]
+    return pools
+
+def sample_terms(rng: random.Random, pool: Counter, k: int) -> List[str]:
+    """Draw k distinct terms, weighted by how often they occur in the real KB."""
+    terms, weights = list(pool.keys()), list(pool.values())
+    k = min(k, len(terms))
+    chosen = []
+    while len(chosen) < k:
+        term = rng.choices(terms, weights)[0]
+        if term not in chosen:
+            chosen.append(term)
+    return chosen
+
+def synthetic_catalog(base: Dict, size: int, seed: int = 0) -> Dict:
+    """Build a catalog of `size` pests shaped like the real KB."""
+    rng = random.Random(seed)
+    pools = term_pools(base)
+    templates = list(base.items())
+
+    def draw(field: str) -> List[str]:
+        return sample_terms(rng, pools["terms"][field], rng.choice(pools["lengths"][field]))
+
+    catalog = {}
+    for i in range(size):
+        template_name, template = rng.choice(templates)
+        name = f"{template_name}_{i}"
+        symptoms = [f"{rng.choice(SYMPTOM_MODIFIERS)} {s}" if rng.random() < 0.2 else s
+                    for s in draw("symptoms")]
+        catalog[name] = {
+            "crops": draw("crops"),
+            "regions": draw("regions"),
+            "symptoms": symptoms,
+            "control_measures": {kind: draw(kind) for kind in ["chemical", "biological", "cultural"]},
+            "life_cycle": template["life_cycle"],
+            "economic_impact": template["economic_impact"],
+            "environmental_conditions": template["environmental_conditions"],
+            "appearance": {"color": draw("color"), "size": draw("size")},
+            "synonyms": [name.replace("_", " ")] + draw("synonyms")
+        }
+    return catalog
+
+def median_ms(fn, inputs: List, repeats: int) -> float:
+    """Median wall time of fn over the inputs, in milliseconds."""
+    timings = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            fn(item)
+            timings.append(time.perf_counter() - start)
+    return float(np.median(timings) * 1000)
+
+def benchmark_size(tool: TextAnalysisTool, path: str, corpus: List[str], repeats: int) -> Dict:
+    """Time every retrieval/scoring stage against the catalog at `path`.
+
+    The embedding caches are off for the run, so every stage that embeds
+    (including the pipeline) pays for the model as an uncached request would.
+    """
+    disk_cache, tool.disk_cache = tool.disk_cache, None
+    cache_size, tool.embedding_cache_size = tool.embedding_cache_size, 0
+    tool.embedding_cache.clear()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kb = KnowledgeBase(path)
+    kb_build_s = time.perf_counter() - start
+    kb_memory_mb = tracemalloc.get_traced_memory()[0] / 2**20
+
+    tool.knowledge_base = kb
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    tool.load_pest_embeddings()
+    encode_pests_s = time.perf_counter() - start
+
+    all_pests = np.arange(len(kb.pest_names))
+    descriptions = [re.sub(r'[^\w\s.,-]', '', d).lower() for d in corpus]
+    tokens = [tokenize(d) for d in descriptions]
+    embeddings = [tool.embed(d) for d in descriptions]
+
+    stages = {
+        "dense_similarity": median_ms(lambda e: tool.pest_similarity(e, all_pests), embeddings, repeats),
+        "symptom_fuzzy": median_ms(lambda t: kb.symptom_match_counts(t, all_pests), tokens, repeats),
+        "bm25": median_ms(lambda t: kb.bm25_scores(t, all_pests), tokens, repeats),
+        "feature_boosts": median_ms(lambda d: kb.feature_hits(d, all_pests) @ FEATURE_BOOSTS, descriptions, repeats),
+        "structured_filter": median_ms(lambda d: kb.filter_candidates("tomato", "tropical"), descriptions, repeats),
+        "pipeline": median_ms(tool.analyze_sync, corpus, repeats)
+    }
+
+    tracemalloc.reset_peak()
+    for description in corpus:
+        tool.analyze_sync(description)
+    analyze_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    tool.disk_cache = disk_cache
+    tool.embedding_cache_size = cache_size
+
+    return {
+        "pests": len(kb.pest_names),
+        "kb_build_s": kb_build_s,
+        "encode_pests_s": encode_pests_s,
+        "kb_memory_mb": kb_memory_mb,
+        "embeddings_mb": (tool.pest_embeddings.nbytes + tool.pest_scales.nbytes) / 2**20,
+        "feature_matrix_mb": sparse_nbytes(kb.feature_matrix) / 2**20,
+        "analyze_peak_mb": analyze_peak_mb,
+        "stages_ms": stages
+    }
+
+def precision_effect(tool: TextAnalysisTool, corpus: List[str], dtypes: List[str]) -> List[Dict]:
+    """Compare rankings with reduced-precision embeddings against float32."""
+    disk_cache, tool.disk_cache = tool.disk_cache, None  # Stored rows would mask the dtype under test
+
+    def rank_all(dtype: str) -> List[List[Dict]]:
+        tool.embedding_dtype = dtype
+        tool.embedding_cache.clear()
+        tool.load_pest_embeddings()
+        return [tool.analyze_sync(d)["pests"] for d in corpus]
+
+    baseline = rank_all("float32")
+    results = []
+    for dtype in dtypes:
+        ranked = rank_all(dtype)
+        top1 = [bool(a) == bool(b) and (not a or a[0]["pest"] == b[0]["pest"]) for a, b in zip(baseline, ranked)]
+        overlap = [len({p["pest"] for p in a} & {p["pest"] for p in b}) / max(len(a), 1) for a, b in zip(baseline, ranked)]
+        deltas = [abs(pa["confidence"] - pb["confidence"]) for a, b in zip(baseline, ranked)
+                  for pa, pb in zip(a, b) if pa["pest"] == pb["pest"]]
+        results.append({
+            "dtype": dtype,
+            "embeddings_mb": (tool.pest_embeddings.nbytes + tool.pest_scales.nbytes) / 2**20,
+            "top1_agreement": float(np.mean(top1)),
+            "top3_overlap": float(np.mean(overlap)),
+            "max_confidence_delta": float(max(deltas, default=0.0))
+        })
+    tool.disk_cache = disk_cache
+    tool.embedding_dtype = config.get('embedding_dtype', 'float32')
+    tool.embedding_cache.clear()
+    tool.load_pest_embeddings()
+    return results
+
+def plot_scaling(results: List[Dict], path: str):
+    """Save per-stage latency and memory against KB size as a PNG."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    sizes = [r["pests"] for r in results]
+    fig, (ax_latency, ax_memory) = plt.subplots(1, 2, figsize=(11, 4))
+    for stage in results[0]["stages_ms"]:
+        ax_latency.plot(sizes, [r["stages_ms"][stage] for r in results], marker="o", label=stage)
+    ax_latency.set_xscale("log")
+    ax_latency.set_yscale("log")
+    ax_latency.set_xlabel("Pests in KB")
+    ax_latency.set_ylabel("Median latency (ms)")
+    ax_latency.set_title("Latency by stage")
+    ax_latency.legend(fontsize="small")
+    for key in ["kb_memory_mb", "embeddings_mb", "feature_matrix_mb", "analyze_peak_mb"]:
+        ax_memory.plot(sizes, [r[key] for r in results], marker="o", label=key)
+    ax_memory.set_xscale("log")
+    ax_memory.set_xlabel("Pests in KB")
+    ax_memory.set_ylabel("MB")
+    ax_memory.set_title("Memory")
+    ax_memory.legend(fontsize="small")
+    fig.tight_layout()
+    fig.savefig(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark identification against synthetic pest catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000], help="Catalog sizes to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for catalog generation")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the description corpus per stage")
+    parser.add_argument("--catalog-dir", type=str, default="synthetic_kb", help="Where generated catalogs are written")
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    parser.add_argument("--plot", type=str, help="Save latency/memory curves as a PNG")
+    parser.add_argument("--precision", action="store_true", help="Only measure the ranking effect of float16/int8 embeddings on the real KB")
+    args = parser.parse_args()
+
+    with open(config['knowledge_base_file'], 'r') as f:
+        base = json.load(f)
+    corpus = load_corpus("Readme.md", None)
+    tool = TextAnalysisTool(config['model_name'])
+
+    if args.precision:
+        for result in precision_effect(tool, corpus, ["float32", "float16", "int8"]):
+            print(f"{result['dtype']:>8}: embeddings {result['embeddings_mb']:.3f} MB, "
+                  f"top-1 agreement {result['top1_agreement']*100:.1f}%, top-3 overlap {result['top3_overlap']*100:.1f}%, "
+                  f"max confidence delta {result['max_confidence_delta']:.4f}")
+        return
+
+    os.makedirs(args.catalog_dir, exist_ok=True)
+    results = []
+    for size in args.sizes:
+        path = os.path.join(args.catalog_dir, f"pest_knowledge_{size}.json")
+        with open(path, 'w') as f:
+            json.dump(synthetic_catalog(base, size, args.seed), f)
+        result = benchmark_size(tool, path, corpus, args.repeats)
+        results.append(result)
+        stages = ", ".join(f"{stage} {ms:.2f} ms" for stage, ms in result["stages_ms"].items())
+        print(f"{size:>6} pests: build {result['kb_build_s']:.2f}s, encode {result['encode_pests_s']:.2f}s, "
+              f"kb {result['kb_memory_mb']:.1f} MB, peak/analyze {result['analyze_peak_mb']:.1f} MB | {stages}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.plot:
+        plot_scaling(results, args.plot)
+
+if __name__ == "__main__":
+    main()
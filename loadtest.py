@@ -0,0 +1,125 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import List, Dict, Optional
+import httpx
+import numpy as np
+from corpus import load_corpus
+
+# Load generator for the /identify-pest endpoint of web.py.
+# Drives the app in-process through the ASGI transport (default) or a running
+# uvicorn via --url, sweeping concurrency levels and reporting throughput,
+# p50/p99 latency and error rate for each level.
+#
+#   python loadtest.py --concurrency 1 2 4 8 16 --requests 200
+#   python loadtest.py --url http://localhost:8000 --plot saturation.png
+
+async def run_level(client: httpx.AsyncClient, path: str, corpus: List[str],
+                    concurrency: int, total: int, seed: int) -> Dict:
+    """Fire `total` requests with `concurrency` workers and summarise the run."""
+    rng = random.Random(seed)
+    descriptions = iter([rng.choice(corpus) for _ in range(total)])
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for description in descriptions:
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, json={"description": description})
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "error_rate": errors / total
+    }
+
+def make_client(url: Optional[str], timeout: float) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=timeout)
+    # Imported here so --url runs don't load the model into this process
+    from web import app
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=timeout)
+
+async def sweep(args) -> List[Dict]:
+    corpus = load_corpus(args.readme, args.log)
+    if not corpus:
+        raise SystemExit("No descriptions found for the load corpus.")
+    path = "/identify-pest?compact=true" if args.compact else "/identify-pest"
+
+    results = []
+    async with make_client(args.url, args.timeout) as client:
+        # Warm-up so model loading is not counted in the first level
+        await client.post(path, json={"description": corpus[0]})
+        for concurrency in args.concurrency:
+            result = await run_level(client, path, corpus, concurrency, args.requests, args.seed)
+            results.append(result)
+            print_row(result)
+    return results
+
+def print_row(result: Dict):
+    print(f"{result['concurrency']:>11} {result['requests']:>8} {result['throughput_rps']:>10.1f} "
+          f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['error_rate']*100:>7.1f}%")
+
+def plot_saturation(results: List[Dict], path: str):
+    """Save throughput and latency against concurrency as a PNG."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    levels = [r["concurrency"] for r in results]
+    fig, (ax_rps, ax_latency) = plt.subplots(1, 2, figsize=(11, 4))
+    ax_rps.plot(levels, [r["throughput_rps"] for r in results], marker="o", color="#4caf50")
+    ax_rps.set_xlabel("Concurrency")
+    ax_rps.set_ylabel("Requests / s")
+    ax_rps.set_title("Throughput")
+    ax_latency.plot(levels, [r["p50_ms"] for r in results], marker="o", label="p50", color="#ff9800")
+    ax_latency.plot(levels, [r["p99_ms"] for r in results], marker="o", label="p99", color="#f44336")
+    ax_latency.set_xlabel("Concurrency")
+    ax_latency.set_ylabel("Latency (ms)")
+    ax_latency.set_title("Latency")
+    ax_latency.legend()
+    fig.tight_layout()
+    fig.savefig(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the pest identification API")
+    parser.add_argument("--url", type=str, help="Base URL of a running server (default: drive web.app in-process)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Concurrency levels to sweep")
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--readme", type=str, default="Readme.md", help="README with '####' example questions")
+    parser.add_argument("--log", type=str, default="requests.jsonl", help="JSONL request log with 'description' fields")
+    parser.add_argument("--compact", action="store_true", help="Request compact responses")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the description order")
+    parser.add_argument("--output", type=str, help="Write results as JSON to this file")
+    parser.add_argument("--plot", type=str, help="Save the saturation curve as a PNG")
+    args = parser.parse_args()
+
+    print(f"{'concurrency':>11} {'requests':>8} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    results = asyncio.run(sweep(args))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.plot:
+        plot_saturation(results, args.plot)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import json
+import argparse
+from collections import Counter
+from main import TextAnalysisTool, config, sanitize
+
+# Pre-populates the disk embedding cache (embedding_cache_path in config.yaml)
+# from a JSONL request log, most frequent requests first, so a fresh deploy
+# starts with the embeddings steady-state traffic would have cached.
+#
+#   python warm_cache.py --log requests.jsonl --limit 50000
+
+def logged_queries(path: str) -> Counter:
+    """Count, per logged request, the text TextAnalysisTool.analyze embeds for it."""
+    counts = Counter()
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if not isinstance(entry, dict) or not str(entry.get("description") or "").strip():
+                continue
+            symptoms = [sanitize(s).strip().lower() for s in entry.get("symptoms") or []]
+            text = f"{sanitize(entry['description'])} {' '.join(s for s in symptoms if s)}".strip()
+            counts[text] += 1
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the disk embedding cache from a request log")
+    parser.add_argument("--log", type=str, default="requests.jsonl", help="JSONL request log with 'description' (and optional 'symptoms') fields")
+    parser.add_argument("--limit", type=int, default=config.get('embedding_cache_max_entries', 100000), help="Warm at most this many of the most frequent requests")
+    parser.add_argument("--batch-size", type=int, default=64, help="Descriptions encoded per model call")
+    args = parser.parse_args()
+
+    if not config.get('embedding_cache_path'):
+        raise SystemExit("embedding_cache_path is not set in config.yaml; nothing to warm.")
+
+    counts = logged_queries(args.log)
+    texts = [text for text, _ in counts.most_common(args.limit)]
+    tool = TextAnalysisTool(config['model_name'])
+    added = tool.warm_embeddings(texts, args.batch_size)
+    print(f"Warmed {added} new embeddings from {len(texts)} distinct requests; "
+          f"cache now holds {len(tool.disk_cache)} entries for {config['model_name']}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,99 @@
 import os
 import json
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
+import contextvars
+import queue
+import atexit
+import random
+import time
+import sqlite3
+import threading
+import hashlib
+import tracemalloc
+from collections import OrderedDict, Counter
 import yaml
 import uuid
-import nltk
 import numpy as np
-from fastapi import FastAPI, HTTPException
+from scipy import sparse
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from sentence_transformers import SentenceTransformer
-from textblob import TextBlob
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 import uvicorn
 import re
+import gzip
+import asyncio
+import orjson
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Load configuration
+with open('config.yaml', 'r') as f:
+    config = yaml.safe_load(f)
 
-# Custom LogRecord to handle missing request_id
+# Id of the request currently being processed, set per request/task
+request_id_var = contextvars.ContextVar('request_id', default='N/A')
+
+# Custom LogRecord that picks up the current request_id
 class CustomLogRecord(logging.LogRecord):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.request_id = getattr(self, 'request_id', 'N/A')
+        self.request_id = request_id_var.get()
 
 logging.setLogRecordFactory(CustomLogRecord)
 
-# Logging setup
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line."""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "request_id": record.request_id,
+            "message": record.getMessage()
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+class DebugSampler(logging.Filter):
+    """Keep only a fraction of DEBUG records; higher levels always pass."""
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+class LazyQueueHandler(QueueHandler):
+    # The queue stays in-process, so hand the record over untouched and let
+    # the listener thread do the message formatting instead of the caller.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+# Logging setup: callers only enqueue, a background listener writes the file
 os.makedirs('logs', exist_ok=True)
 logger = logging.getLogger('PestIdentification')
-logger.setLevel(logging.INFO)
+logger.setLevel(config.get('log_level', 'INFO'))
 handler = RotatingFileHandler('logs/pest_identification.log', maxBytes=1000000, backupCount=5)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(request_id)s] - %(message)s')
+if config.get('log_format') == 'json':
+    formatter = JsonFormatter()
+else:
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - [%(request_id)s] - %(message)s')
 handler.setFormatter(formatter)
-logger.addHandler(handler)
-
-# Download NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/wordnet')
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('wordnet')
-    nltk.download('averaged_perceptron_tagger')
-
-# Load configuration
-with open('config.yaml', 'r') as f:
-    config = yaml.safe_load(f)
+log_queue = queue.SimpleQueue()
+queue_handler = LazyQueueHandler(log_queue)
+queue_handler.addFilter(DebugSampler(config.get('log_debug_sample_rate', 1.0)))
+logger.addHandler(queue_handler)
+log_listener = QueueListener(log_queue, handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 # Pest-related keywords for input validation
 PEST_KEYWORDS = [
@@ -55,11 +103,153 @@ PEST_KEYWORDS = [
     "damage", "infestation", "infested", "chewed", "control", "spray", "trap", "webbing", "honeydew", "stunted"
 ]
 
+# Words are runs of word characters; inner hyphens/periods stay attached
+# ("cat-facing", "1.5") the same way TextBlob's .words kept them
+TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+
+def sanitize(text: str) -> str:
+    """Drop everything except word characters, whitespace and . , -"""
+    return re.sub(r'[^\w\s.,-]', '', text)
+
+def cache_key(text: str, lowercase: bool) -> str:
+    """Embedding cache key: spacing never changes the vector, case doesn't for a lowercasing model."""
+    key = " ".join(text.split())
+    return key.lower() if lowercase else key
+
+def model_lowercases(model) -> bool:
+    """Whether a SentenceTransformer lowercases its input, in its Transformer module or its tokenizer."""
+    try:
+        if getattr(model[0], "do_lower_case", False):
+            return True
+    except (TypeError, IndexError, KeyError):
+        pass
+    return bool(getattr(getattr(model, "tokenizer", None), "do_lower_case", False))
+
+def tokenize(text: str) -> List[str]:
+    """Split text into words, dropping punctuation."""
+    return TOKEN_PATTERN.findall(text)
+
+# Function words carry no evidence about a pest, yet are rare in the KB's terse
+# symptom lists and would get the highest BM25 weights; they and very short
+# tokens are left out of the lexical index and queries
+BM25_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how i if in into is it its itself just me more most my myself no nor not now of off on once only
+or other our ours out over own same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why will
+with would you your yours
+""".split())
+BM25_MIN_TOKEN_LENGTH = 3
+
+def content_tokens(tokens: List[str]) -> List[str]:
+    """Tokens that count as lexical evidence: no stopwords, nothing shorter than BM25_MIN_TOKEN_LENGTH."""
+    return [t for t in tokens if len(t) >= BM25_MIN_TOKEN_LENGTH and t not in BM25_STOPWORDS]
+
+# Score boosts: per fuzzy symptom match, and per matched crop/colour/region group
+SYMPTOM_BOOST = 0.1
+FEATURE_GROUPS = ["crops", "colors", "regions"]
+FEATURE_BOOSTS = np.array([0.05, 0.05, 0.05], dtype=np.float32)
+
+# Feature terms match on whole words, with hyphenated words split ("cream-colored")
+FEATURE_WORD_PATTERN = re.compile(r"[^\W_]+")
+
+def term_keys(words: List[str]) -> List[str]:
+    """Lookup keys of a feature term or text n-gram, with and without a plural "s"/"es"."""
+    key = " ".join(words)
+    keys = [key]
+    for suffix in ("s", "es"):
+        if key.endswith(suffix) and len(key) - len(suffix) >= 3:
+            keys.append(key[:-len(suffix)])
+    return keys
+
+def sparse_nbytes(matrix: sparse.spmatrix) -> int:
+    """Bytes held by the arrays of a CSR/CSC matrix."""
+    return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+def traced_mb() -> float:
+    """Memory currently traced by tracemalloc in MB (0 when tracing is off)."""
+    return tracemalloc.get_traced_memory()[0] / 2**20 if tracemalloc.is_tracing() else 0.0
+
+def store_embeddings(embeddings: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Store row embeddings as float32, float16 or int8; returns (values, per-row scales)."""
+    embeddings = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    if dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1, keepdims=True) / 127.0
+        scales[scales == 0] = 1.0
+        return np.round(embeddings / scales).astype(np.int8), scales
+    return embeddings.astype(dtype), np.ones((len(embeddings), 1), dtype=np.float32)
+
+def load_embeddings(values: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """Inverse of store_embeddings, back to float32."""
+    return values.astype(np.float32) * scales
+
+# Static Chart.js settings, built once and shared by every chart; only the
+# labels and confidence values change per request
+CHART_DATASET_STYLE = {
+    "backgroundColor": ["#4caf50", "#ff9800", "#f44336"],
+    "borderColor": ["#388e3c", "#f57c00", "#d32f2f"],
+    "borderWidth": 1
+}
+
+CHART_OPTIONS = {
+    "scales": {
+        "y": {
+            "beginAtZero": True,
+            "title": {"display": True, "text": "Confidence Score"}
+        },
+        "x": {
+            "title": {"display": True, "text": "Pest"}
+        }
+    },
+    "plugins": {
+        "title": {"display": True, "text": "Pest Identification Confidence"}
+    }
+}
+
+# Rendered per-pest report details, keyed by KB version then pest
+REPORT_DETAILS_CACHE = {}
+
+# Autocomplete index
+class SuggestionTrie:
+    """Prefix trie over KB terms; every node keeps its top suggestions precomputed."""
+    def __init__(self, limit: int = 10):
+        self.limit = limit
+        self.root = {}
+
+    def build(self, counts: Counter):
+        """Index (term, kind) pairs ranked by count, reachable from the start of any word."""
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0][0]))
+        for (term, kind), count in ranked:
+            entry = {"text": term, "kind": kind, "count": count}
+            words = term.split()
+            for start in range(len(words)):
+                node = self.root
+                for char in " ".join(words[start:]):
+                    node = node.setdefault(char, {})
+                    top = node.setdefault("", [])  # "" never is a character, so it holds the suggestions
+                    if len(top) < self.limit and entry not in top:
+                        top.append(entry)
+
+    def search(self, prefix: str, limit: Optional[int] = None) -> List[Dict]:
+        node = self.root
+        for char in prefix.strip().lower():
+            node = node.get(char)
+            if node is None:
+                return []
+        return node.get("", [])[:limit or self.limit]
+
 # Knowledge Base
 class KnowledgeBase:
     def __init__(self, file_path: str):
         self.file_path = file_path
+        start_mb = traced_mb()
         self.data = self.load_knowledge()
+        self.compile_features()
+        self.build_bm25_index(config.get('bm25_k1', 1.5), config.get('bm25_b', 0.75))
+        self.build_suggestions()
+        self.render_report_details()
+        self.traced_load_mb = traced_mb() - start_mb
 
     def load_knowledge(self) -> Dict:
         if not os.path.exists(self.file_path):
@@ -163,25 +353,439 @@ class KnowledgeBase:
         with open(self.file_path, 'r') as f:
             return json.load(f)
 
+    def pest_features(self, data: Dict) -> List[List[str]]:
+        """Feature terms of one pest, one list per entry of FEATURE_GROUPS."""
+        return [
+            data.get("crops", []),
+            data.get("appearance", {}).get("color", []),
+            data.get("regions", [])
+        ]
+
+    def compile_features(self):
+        """Compile the KB into pest x feature matrices used for vectorized scoring."""
+        self.pest_names = list(self.data.keys())
+        self.feature_terms = []
+        term_groups = []
+        term_index = {}
+        # Text n-gram key -> feature columns, so matching a description costs one dict lookup per n-gram
+        self.term_columns = {}
+        self.max_term_words = 1
+        rows, cols = [], []
+        self.symptom_terms = []
+        symptom_owner = []
+        for i, pest in enumerate(self.pest_names):
+            data = self.data[pest]
+            for group, terms in enumerate(self.pest_features(data)):
+                for term in terms:
+                    key = (group, term.lower())
+                    if key not in term_index:
+                        term_index[key] = len(self.feature_terms)
+                        self.feature_terms.append(term.lower())
+                        term_groups.append(group)
+                        words = FEATURE_WORD_PATTERN.findall(term.lower())
+                        for lookup in (term_keys(words) if words else []):
+                            self.term_columns.setdefault(lookup, []).append(term_index[key])
+                        self.max_term_words = max(self.max_term_words, len(words))
+                    rows.append(i)
+                    cols.append(term_index[key])
+            for symptom in data.get("symptoms", []):
+                self.symptom_terms.append(symptom.lower())
+                symptom_owner.append(i)
+
+        # Sparse pests x terms incidence (column-major, a query only reads its matched
+        # terms), and terms x groups one-hot to fold terms into groups
+        self.feature_matrix = sparse.csc_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                                shape=(len(self.pest_names), len(self.feature_terms)))
+        self.feature_groups = np.eye(len(FEATURE_GROUPS), dtype=np.float32)[term_groups].reshape(-1, len(FEATURE_GROUPS))
+        self.symptom_array = np.array(self.symptom_terms, dtype=object)
+        self.symptom_owner = np.array(symptom_owner, dtype=np.intp)
+
+        # Inverted indexes from crop/region to the pests that list it, under the same
+        # term_keys variants the feature boosts match, so filtering is never stricter than scoring
+        self.crop_index = {}
+        self.region_index = {}
+        for (group, term), col in term_index.items():
+            index = {"crops": self.crop_index, "regions": self.region_index}.get(FEATURE_GROUPS[group])
+            if index is None:
+                continue
+            pests = self.feature_matrix[:, col].indices.astype(np.intp)
+            for key in term_keys(FEATURE_WORD_PATTERN.findall(term)):
+                index[key] = np.union1d(index.get(key, np.empty(0, dtype=np.intp)), pests)
+
+    def build_bm25_index(self, k1: float, b: float):
+        """Sparse BM25 weights (pests x terms) over symptoms, crops, appearance and synonyms."""
+        self.bm25_vocabulary = {}
+        self.bm25_k1 = k1
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(self.pest_names))
+        for i, pest in enumerate(self.pest_names):
+            data = self.data[pest]
+            appearance = data.get("appearance", {})
+            fields = (data.get("symptoms", []) + data.get("crops", []) + appearance.get("color", []) +
+                      appearance.get("size", []) + data.get("synonyms", []))
+            term_counts = Counter(content_tokens(tokenize(" ".join(fields).lower())))
+            lengths[i] = sum(term_counts.values())
+            for term, count in term_counts.items():
+                rows.append(i)
+                cols.append(self.bm25_vocabulary.setdefault(term, len(self.bm25_vocabulary)))
+                counts.append(count)
+
+        rows = np.array(rows, dtype=np.intp)
+        cols = np.array(cols, dtype=np.intp)
+        tf = np.array(counts, dtype=np.float32)
+        n = len(self.pest_names)
+        df = np.bincount(cols, minlength=len(self.bm25_vocabulary))
+        idf = np.log(1 + (n - df + 0.5) / (df + 0.5))
+        self.bm25_idf = idf.astype(np.float32)
+        avgdl = lengths.mean() if n and lengths.mean() > 0 else 1.0
+        weights = idf[cols] * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[rows] / avgdl))
+        # Column-major so a query only touches the columns of its terms
+        self.bm25_matrix = sparse.csc_matrix((weights, (rows, cols)), shape=(n, len(self.bm25_vocabulary)),
+                                             dtype=np.float32)
+
+    def bm25_scores(self, tokens: List[str], candidates: np.ndarray) -> np.ndarray:
+        """BM25 score of each candidate pest for the query tokens, as a fraction (0-1) of the query's maximum.
+
+        The maximum, the sum of idf * (k1 + 1) over the query's terms, depends
+        only on the query, so a candidate matching one weak term stays low
+        however poorly the others match.
+        """
+        term_ids = sorted({self.bm25_vocabulary[t] for t in content_tokens(tokens) if t in self.bm25_vocabulary})
+        if not term_ids:
+            return np.zeros(len(candidates))
+        max_score = float(self.bm25_idf[term_ids].sum()) * (self.bm25_k1 + 1)
+        return np.asarray(self.bm25_matrix[:, term_ids].sum(axis=1)).ravel()[candidates] / max_score
+
+    def build_suggestions(self):
+        """Index every symptom, crop, colour and synonym for autocomplete, ranked by how many pests list it."""
+        counts = Counter()
+        for data in self.data.values():
+            for kind, terms in (("symptom", data.get("symptoms", [])),
+                                ("crop", data.get("crops", [])),
+                                ("color", data.get("appearance", {}).get("color", [])),
+                                ("synonym", data.get("synonyms", []))):
+                counts.update((term.lower(), kind) for term in set(terms))
+        self.suggestions = SuggestionTrie()
+        self.suggestions.build(counts)
+
+    def render_report_details(self):
+        """Pre-render the details section of every pest's report, once per KB version."""
+        self.version = hashlib.sha1(json.dumps(self.data, sort_keys=True).encode()).hexdigest()
+        if self.version in REPORT_DETAILS_CACHE:
+            return
+        details = {}
+        for pest, pest_data in self.data.items():
+            lines = ["Details:"]
+            for key, value in pest_data.items():
+                if isinstance(value, dict):
+                    lines.append(f"  {key.replace('_', ' ').title()}:")
+                    for sub_key, sub_value in value.items():
+                        lines.append(f"    - {sub_key.replace('_', ' ').title()}: {sub_value}")
+                else:
+                    lines.append(f"  {key.replace('_', ' ').title()}: {value}")
+            details[pest] = "\n".join(lines) + "\n"
+        REPORT_DETAILS_CACHE[self.version] = details
+
+    def report_details(self, pest: str, version: Optional[str] = None) -> str:
+        """Pre-rendered details of a pest, from KB `version` if this process has loaded it, else the current KB."""
+        details = REPORT_DETAILS_CACHE.get(version) or REPORT_DETAILS_CACHE[self.version]
+        return details.get(pest, "Details:\n")
+
+    def generate_report(self, report_id: str, description: str, pest: str, confidence: float,
+                        kb_version: Optional[str] = None) -> str:
+        os.makedirs('reports', exist_ok=True)
+        report_path = f'reports/pest_report_{report_id}.txt'
+
+        # Only the header varies per request; the details come pre-rendered from the KB
+        report = (f"Pest Identification Report\n\n"
+                  f"Identified Pest: {pest}\n"
+                  f"Description: {description}\n"
+                  f"Confidence: {confidence:.2f}\n\n"
+                  + self.report_details(pest, kb_version))
+
+        # Written whole then renamed, so another worker never reads a partial report
+        with open(f'{report_path}.tmp', 'w') as f:
+            f.write(report)
+        os.replace(f'{report_path}.tmp', report_path)
+        logger.info("Report saved to %s", report_path)
+        return report
+
+    def save_report_args(self, report_id: str, report_args: Dict):
+        """Store what a lazily requested report is rendered from, where every worker can read it."""
+        os.makedirs('reports', exist_ok=True)
+        args_path = f'reports/pest_report_{report_id}.json'
+        with open(f'{args_path}.tmp', 'w') as f:
+            json.dump(report_args, f)
+        os.replace(f'{args_path}.tmp', args_path)
+
+    def render_report(self, report_id: str) -> Optional[str]:
+        """Full text of a report, rendering a lazily requested one on first access."""
+        if not re.fullmatch(r'[0-9a-f]{32}', report_id):
+            return None
+        report_path = f'reports/pest_report_{report_id}.txt'
+        if os.path.exists(report_path):
+            with open(report_path, 'r') as f:
+                return f.read()
+        args_path = f'reports/pest_report_{report_id}.json'
+        if not os.path.exists(args_path):
+            return None
+        with open(args_path, 'r') as f:
+            report_args = json.load(f)
+        return self.generate_report(report_id, **report_args)
+
+    def filter_candidates(self, crop: Optional[str] = None, region: Optional[str] = None) -> np.ndarray:
+        """Indices of the pests compatible with the given crop and region."""
+        candidates = np.arange(len(self.pest_names))
+        for index, value in ((self.crop_index, crop), (self.region_index, region)):
+            if value and value.strip():
+                words = FEATURE_WORD_PATTERN.findall(value.lower())
+                matches = [index[key] for key in (term_keys(words) if words else []) if key in index]
+                pests = np.unique(np.concatenate(matches)) if matches else np.empty(0, dtype=np.intp)
+                candidates = np.intersect1d(candidates, pests)
+        return candidates
+
+    def candidate_symptoms(self, candidates: np.ndarray):
+        """Symptoms of the candidate pests, with owners given as positions in candidates."""
+        position = np.full(len(self.pest_names), -1, dtype=np.intp)
+        position[candidates] = np.arange(len(candidates))
+        owner = position[self.symptom_owner]
+        keep = owner >= 0
+        return self.symptom_array[keep].tolist(), owner[keep]
+
+    def feature_hits(self, text_lower: str, candidates: np.ndarray) -> np.ndarray:
+        """Per candidate pest and feature group, whether any of the pest's terms occurs in the text as whole words."""
+        words = FEATURE_WORD_PATTERN.findall(text_lower)
+        columns = set()
+        for n in range(1, self.max_term_words + 1):
+            for start in range(len(words) - n + 1):
+                for lookup in term_keys(words[start:start + n]):
+                    columns.update(self.term_columns.get(lookup, ()))
+        if not columns:
+            return np.zeros((len(candidates), len(FEATURE_GROUPS)), dtype=bool)
+        columns = sorted(columns)
+        hits = self.feature_matrix[:, columns] @ self.feature_groups[columns]
+        return np.asarray(hits)[candidates] > 0
+
+    def symptom_match_counts(self, tokens: List[str], candidates: np.ndarray) -> np.ndarray:
+        """Per candidate pest, the number of (token, symptom) pairs that fuzzy-match."""
+        terms, owner = self.candidate_symptoms(candidates)
+        if not tokens or not terms:
+            return np.zeros(len(candidates))
+        matches = process.cdist(tokens, terms, scorer=fuzz.partial_ratio) > 85
+        return np.bincount(owner, weights=matches.sum(axis=0), minlength=len(candidates))
+
+    def symptom_similarity(self, symptoms: List[str], candidates: np.ndarray) -> np.ndarray:
+        """Per candidate pest, the mean best fuzzy match (0-1) of each given symptom."""
+        terms, owner = self.candidate_symptoms(candidates)
+        if not symptoms or not terms:
+            return np.zeros(len(candidates))
+        scores = process.cdist(symptoms, terms, scorer=fuzz.token_set_ratio) / 100.0
+        best = np.zeros((len(candidates), len(symptoms)))
+        np.maximum.at(best, owner, scores.T)
+        return best.mean(axis=1)
+
     def search(self, query: str) -> Dict:
-        logger.info(f"Searching knowledge base for: {query}")
+        logger.debug("Searching knowledge base for: %s", query)
         for pest, data in self.data.items():
             if fuzz.partial_ratio(query.lower(), pest.lower()) > 80:
-                logger.info(f"Found data for: {query}")
+                logger.debug("Found data for: %s", query)
                 return {pest: data}
         return {}
 
     def get(self, pest: str) -> Dict:
         return self.data.get(pest, {})
 
+# Disk-backed embedding cache
+class DiskEmbeddingCache:
+    """SQLite store of description embeddings, shared across restarts and by all workers on a node.
+
+    Rows are keyed by model name and normalized text. Every 100 writes, rows
+    beyond max_entries are evicted least recently used first. Hits only note
+    their time in memory and recency is written in batches. Every write gives
+    up after a 50 ms busy timeout and is dropped (the cache is best effort), so
+    a read in this process waits at most that long behind another worker's
+    write lock.
+    """
+    def __init__(self, path: str, model_name: str, max_entries: int):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.puts_since_eviction = 0
+        self.touched = {}  # key -> last hit time, not yet written
+        self.touches_flushed_at = time.time()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        # WAL lets every worker read while one writes
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""CREATE TABLE IF NOT EXISTS embeddings (
+            model TEXT NOT NULL,
+            text TEXT NOT NULL,
+            dtype TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            scale REAL NOT NULL,
+            last_used REAL NOT NULL,
+            PRIMARY KEY (model, text))""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        # Setup above may wait for other workers; from here on writes are best effort
+        self.conn.execute("PRAGMA busy_timeout = 50")
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        with self.lock:
+            row = self.conn.execute("SELECT dtype, vector, scale FROM embeddings WHERE model = ? AND text = ?",
+                                    (self.model_name, key)).fetchone()
+            if row is None:
+                return None
+            self.touched[key] = time.time()
+            if len(self.touched) >= 100 or time.time() - self.touches_flushed_at >= 30:
+                self.flush_touches()
+        dtype, vector, scale = row
+        return np.frombuffer(vector, dtype=dtype).reshape(1, -1), np.array([[scale]], dtype=np.float32)
+
+    def put(self, key: str, values: np.ndarray, scales: np.ndarray) -> bool:
+        """Store one embedding; returns False if the write was dropped."""
+        with self.lock:
+            self.flush_touches()
+            try:
+                self.conn.execute("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)",
+                                  (self.model_name, key, values.dtype.name, values.tobytes(),
+                                   float(scales[0, 0]), time.time()))
+                self.puts_since_eviction += 1
+                if self.puts_since_eviction >= 100:
+                    self.evict()
+                return True
+            except sqlite3.OperationalError as e:
+                logger.warning("Embedding cache write failed: %s", e)
+                return False
+
+    def flush_touches(self):
+        """Write the pending hit times in one statement; skipped if the write lock isn't free within 50 ms."""
+        touched, self.touched = self.touched, {}
+        self.touches_flushed_at = time.time()
+        if not touched:
+            return
+        try:
+            self.conn.executemany("UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                                  [(used, self.model_name, key) for key, used in touched.items()])
+        except sqlite3.OperationalError:
+            pass  # Another worker holds the write lock; recency is best effort
+
+    def evict(self):
+        """Drop the least recently used rows beyond max_entries."""
+        self.puts_since_eviction = 0
+        count = self.conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute("DELETE FROM embeddings WHERE rowid IN "
+                              "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                              (count - self.max_entries,))
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            return self.conn.execute("SELECT 1 FROM embeddings WHERE model = ? AND text = ?",
+                                     (self.model_name, key)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM embeddings WHERE model = ?",
+                                     (self.model_name,)).fetchone()[0]
+
 # Text Analysis Tool
 class TextAnalysisTool:
-    def __init__(self, model_name: str):
+    def __init__(self, model_name: str, knowledge_base: Optional[KnowledgeBase] = None):
+        start_mb = traced_mb()
         self.model = SentenceTransformer(model_name)
-        self.knowledge_base = KnowledgeBase(config['knowledge_base_file'])
+        self.model_traced_mb = traced_mb() - start_mb
+        self.lowercase_keys = model_lowercases(self.model)
+        self.knowledge_base = knowledge_base or KnowledgeBase(config['knowledge_base_file'])
+        self.embedding_dtype = config.get('embedding_dtype', 'float32')
+        self.embedding_cache_size = config.get('embedding_cache_size', 1024)
+        self.embedding_cache = OrderedDict()
+        self.embedding_cache_lock = threading.Lock()  # analyze may run on several threads
+        cache_path = config.get('embedding_cache_path')
+        self.disk_cache = DiskEmbeddingCache(cache_path, model_name, config.get('embedding_cache_max_entries', 100000)) if cache_path else None
         self.pest_reference = "Pests cause damage to crops with symptoms like yellowing leaves, sticky residue, holes, or insect presence."
+        self.reference_embedding = self.embed(self.pest_reference)
+        self.load_pest_embeddings()
+
+    def pest_text(self, data: Dict) -> str:
+        """Combine symptoms, crops, and appearance into the text embedded for a pest."""
+        return " ".join(data.get("symptoms", []) + data.get("crops", []) +
+                        [f"{k} {v}" for k, v in data.get("appearance", {}).items()])
+
+    def encode_pests(self) -> np.ndarray:
+        """Embed every pest once, L2-normalized so similarity is a single matrix product."""
+        texts = [self.pest_text(self.knowledge_base.data[pest]) for pest in self.knowledge_base.pest_names]
+        embeddings = np.asarray(self.model.encode(texts), dtype=np.float32)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    def load_pest_embeddings(self):
+        """(Re)build the pest embeddings in the configured storage precision."""
+        self.pest_embeddings, self.pest_scales = store_embeddings(self.encode_pests(), self.embedding_dtype)
+
+    def pest_similarity(self, embedding: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        """Cosine similarity of a normalized embedding to each candidate pest."""
+        return (self.pest_embeddings[candidates] @ embedding) * self.pest_scales[candidates, 0]
+
+    def embed(self, text: str) -> np.ndarray:
+        """Normalized embedding of text, from the in-memory LRU, then the disk cache, then the model."""
+        key = cache_key(text, self.lowercase_keys)
+        with self.embedding_cache_lock:
+            stored = self.embedding_cache.get(key)
+            if stored is not None:
+                self.embedding_cache.move_to_end(key)
+        if stored is not None:
+            return load_embeddings(*stored)[0]
+        stored = self.disk_cache.get(key) if self.disk_cache is not None else None
+        if stored is None:
+            embedding = np.asarray(self.model.encode(text), dtype=np.float32)
+            stored = store_embeddings(embedding / np.linalg.norm(embedding), self.embedding_dtype)
+            if self.disk_cache is not None:
+                self.disk_cache.put(key, *stored)
+        if self.embedding_cache_size:
+            with self.embedding_cache_lock:
+                self.embedding_cache[key] = stored
+                if len(self.embedding_cache) > self.embedding_cache_size:
+                    self.embedding_cache.popitem(last=False)
+        return load_embeddings(*stored)[0]
 
-    def is_pest_related(self, description: str) -> bool:
+    def warm_embeddings(self, texts: List[str], batch_size: int = 64) -> int:
+        """Encode texts missing from the disk cache in batches and store them; returns how many were stored."""
+        if self.disk_cache is None:
+            return 0
+        # One text per cache key, so variants differing only in spacing (or case) are encoded once
+        missing = {}
+        for text in texts:
+            key = cache_key(text, self.lowercase_keys)
+            if key not in missing and key not in self.disk_cache:
+                missing[key] = text
+        missing = list(missing.items())
+        added = 0
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            embeddings = np.asarray(self.model.encode([text for _, text in batch]), dtype=np.float32).reshape(len(batch), -1)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+            for (key, _), embedding in zip(batch, embeddings):
+                added += self.disk_cache.put(key, *store_embeddings(embedding, self.embedding_dtype))
+        return added
+
+    def memory_usage(self) -> Dict:
+        """Bytes held by the model parameters, pest embeddings and embedding cache, in MB."""
+        parameters = getattr(self.model, "parameters", None)
+        model_mb = sum(p.numel() * p.element_size() for p in parameters()) / 2**20 if parameters else None
+        with self.embedding_cache_lock:
+            cache_bytes = sum(values.nbytes + scales.nbytes for values, scales in self.embedding_cache.values())
+        return {
+            "model": {"parameters_mb": model_mb, "traced_load_mb": self.model_traced_mb},
+            "pest_embeddings": {
+                "dtype": self.embedding_dtype,
+                "mb": (self.pest_embeddings.nbytes + self.pest_scales.nbytes) / 2**20
+            },
+            "embedding_cache": {"entries": len(self.embedding_cache), "mb": cache_bytes / 2**20},
+            "disk_embedding_cache": {"path": self.disk_cache.path, "entries": len(self.disk_cache)} if self.disk_cache is not None else None
+        }
+
+    def is_pest_related(self, description: str, tokens: Optional[List[str]] = None) -> bool:
         """Check if the description is pest-related using keywords, semantic similarity, and symptom matching."""
         description_lower = description.lower()
         keyword_count = sum(keyword in description_lower for keyword in PEST_KEYWORDS)
@@ -191,38 +795,48 @@ class TextAnalysisTool:
             return True
         
         # Semantic similarity check
-        desc_embedding = self.model.encode(description)
-        ref_embedding = self.model.encode(self.pest_reference)
-        similarity = float(np.dot(desc_embedding, ref_embedding) / 
-                          (np.linalg.norm(desc_embedding) * np.linalg.norm(ref_embedding)))
+        similarity = float(np.dot(self.embed(description), self.reference_embedding))
         
         # Fuzzy symptom matching
-        blob = TextBlob(description_lower)
-        tokens = blob.words
-        for pest, data in self.knowledge_base.data.items():
-            symptoms = [s.lower() for s in data.get("symptoms", [])]
-            for token in tokens:
-                for symptom in symptoms:
-                    if fuzz.partial_ratio(token, symptom) > 85:  # Fuzzy match for symptoms
-                        return True
+        if tokens is None:
+            tokens = tokenize(description_lower)
+        all_pests = np.arange(len(self.knowledge_base.pest_names))
+        if self.knowledge_base.symptom_match_counts(tokens, all_pests).any():
+            return True
         
         return similarity > 0.65  # Lowered threshold for broader detection
 
-    async def analyze(self, description: str) -> Dict:
-        logger.info(f"Analyzing description: {description}")
-        if len(description) > config['max_description_length']:
-            raise ValueError(f"Description exceeds maximum length of {config['max_description_length']} characters.")
-        if not description.strip():
+    async def analyze(self, description: str, crop: Optional[str] = None, region: Optional[str] = None,
+                      symptoms: Optional[List[str]] = None) -> Dict:
+        return self.analyze_sync(description, crop=crop, region=region, symptoms=symptoms)
+
+    def analyze_sync(self, description: str, crop: Optional[str] = None, region: Optional[str] = None,
+                     symptoms: Optional[List[str]] = None) -> Dict:
+        """Score a description; synchronous and CPU-bound, so servers run it on a worker thread."""
+        logger.debug("Scoring description: %s (crop=%s, region=%s, symptoms=%s)", description, crop, region, symptoms)
+        # Symptoms, crop and region are scored with the description, so they share its length budget
+        input_length = len(description) + sum(len(s) for s in symptoms or []) + len(crop or "") + len(region or "")
+        if input_length > config['max_description_length']:
+            raise ValueError(f"Description, symptoms, crop and region together exceed the maximum length of "
+                             f"{config['max_description_length']} characters.")
+        symptoms = [sanitize(s).strip().lower() for s in symptoms or []]
+        symptoms = [s for s in symptoms if s]
+        if not description.strip() and not symptoms:
             raise ValueError("Description cannot be empty.")
+        structured = bool(crop or region or symptoms)
 
         # Sanitize input
-        description = re.sub(r'[^\w\s.,-]', '', description)
+        description = sanitize(description)
         description_lower = description.lower()  # Define description_lower for scoring
-        logger.debug(f"Sanitized description: {description}, lowercase: {description_lower}")
+        logger.debug("Sanitized description: %s", description)
+
+        # Tokenize once; the same token list feeds validation and scoring
+        symptom_text = " ".join(symptoms)
+        tokens = tokenize(f"{description_lower} {symptom_text}")
 
-        # Check if pest-related
-        if not self.is_pest_related(description):
-            logger.info(f"Non-pest-related input detected: {description}")
+        # Check if pest-related; structured fields already say what the user is reporting
+        if not structured and not self.is_pest_related(description, tokens):
+            logger.info("Non-pest-related input detected: %s", description)
             return {
                 "pests": [],
                 "likely_pest": None,
@@ -236,40 +850,33 @@ class TextAnalysisTool:
                 ]
             }
 
-        blob = TextBlob(description_lower)
-        tokens = blob.words
-        symptoms = [token for token in tokens if any(symptom in token for symptom in [
-            "sticky", "yellowing", "mold", "tiny", "white", "curled", "stippled", "webbing", "honeydew", 
-            "stunted", "bugs", "insects", "mites", "holes", "chewed", "speckled"
-        ])]
-
-        pest_scores = []
-        for pest, data in self.knowledge_base.data.items():
-            # Combine symptoms, crops, and appearance for scoring
-            symptom_text = " ".join(data.get("symptoms", []) + data.get("crops", []) + 
-                                   [f"{k} {v}" for k, v in data.get("appearance", {}).items()])
-            symptom_embedding = self.model.encode(symptom_text)
-            description_embedding = self.model.encode(description)
-            similarity = float(np.dot(description_embedding, symptom_embedding) / 
-                             (np.linalg.norm(description_embedding) * np.linalg.norm(symptom_embedding)))
-            
-            # Fuzzy symptom match boost
-            pest_symptoms = [s.lower() for s in data.get("symptoms", [])]
-            symptom_score = 0
-            for token in tokens:
-                for symptom in pest_symptoms:
-                    if fuzz.partial_ratio(token, symptom) > 85:
-                        symptom_score += 0.1  # Boost for each match
-            
-            # Crop and appearance match boost
-            crop_score = 0.05 if any(crop in description_lower for crop in data.get("crops", [])) else 0
-            appearance_score = 0.05 if any(color in description_lower for color in data.get("appearance", {}).get("color", [])) else 0
-            
-            final_score = similarity + symptom_score + crop_score + appearance_score
-            if final_score > 0.5:  # Lowered threshold
-                pest_scores.append({"pest": pest, "confidence": final_score})
-
-        top_pests = sorted(pest_scores, key=lambda x: x["confidence"], reverse=True)[:3]
+        # Only pests listed for the given crop/region are scored
+        kb = self.knowledge_base
+        candidates = kb.filter_candidates(crop, region)
+        logger.debug("Scoring %d of %d pests", len(candidates), len(kb.pest_names))
+
+        # Score the candidates at once: similarity plus symptom and crop/colour/region boosts.
+        # Without free text, the structured symptoms give the similarity and the model is skipped;
+        # with bm25_weight at 1 the model is skipped too and retrieval is purely lexical.
+        bm25_weight = config.get('bm25_weight', 0.3)
+        if not description.strip():
+            similarity = kb.symptom_similarity(symptoms, candidates)
+        elif bm25_weight < 1:
+            similarity = self.pest_similarity(self.embed(f"{description} {symptom_text}".strip()), candidates)
+        else:
+            similarity = np.zeros(len(candidates))
+
+        # Hybrid retrieval: fuse with BM25, already scaled to the query's maximum
+        lexical = kb.bm25_scores(tokens, candidates)
+        similarity = (1 - bm25_weight) * similarity + bm25_weight * lexical
+        feature_text = " ".join([description_lower, symptom_text, (crop or "").lower(), (region or "").lower()])
+        final_scores = (similarity
+                        + SYMPTOM_BOOST * kb.symptom_match_counts(tokens, candidates)
+                        + kb.feature_hits(feature_text, candidates) @ FEATURE_BOOSTS)
+
+        passing = np.flatnonzero(final_scores > 0.5)  # Lowered threshold
+        ranked = passing[np.argsort(-final_scores[passing], kind="stable")][:3]
+        top_pests = [{"pest": kb.pest_names[candidates[i]], "confidence": float(final_scores[i])} for i in ranked]
         likely_pest = top_pests[0]["pest"] if top_pests else None
 
         if not top_pests:
@@ -286,7 +893,7 @@ class TextAnalysisTool:
                 ]
             }
 
-        logger.info(f"Identified pests: {[p['pest'] for p in top_pests]}")
+        logger.info("Identified pests: %s", [p['pest'] for p in top_pests])
 
         user_guidance = [
             "For better accuracy, include details like:",
@@ -304,15 +911,51 @@ class TextAnalysisTool:
 
 # AgroPestAgent
 class AgroPestAgent:
-    def __init__(self):
-        self.knowledge_base = KnowledgeBase(config['knowledge_base_file'])
-        self.text_tool = TextAnalysisTool(config['model_name'])
+    def __init__(self, knowledge_base: Optional[KnowledgeBase] = None):
+        self.knowledge_base = knowledge_base or KnowledgeBase(config['knowledge_base_file'])
+        self.text_tool = TextAnalysisTool(config['model_name'], self.knowledge_base)
+        # tracemalloc's peak is process-wide, so a request's peak is only recorded
+        # when it ran with no other request in flight
+        self.request_peak_mb = None
+        self.requests_in_flight = 0
+        self.traced_alone = False
+        self.trace_lock = threading.Lock()
         logger.info("AgroPestAgent initialized")
 
-    async def analyze(self, description: str) -> Dict:
-        logger.info(f"Analyzing description: {description}")
+    def memory_report(self, top: int = 10) -> Dict:
+        """Break memory usage down by component; traced numbers need tracemalloc running."""
+        kb = self.knowledge_base
+        report = self.text_tool.memory_usage()
+        report["knowledge_base"] = {
+            "pests": len(kb.pest_names),
+            "traced_load_mb": kb.traced_load_mb,
+            "feature_matrices_mb": (sparse_nbytes(kb.feature_matrix) + kb.feature_groups.nbytes) / 2**20,
+            "bm25_index_mb": sparse_nbytes(kb.bm25_matrix) / 2**20
+        }
+        report["request_peak_mb"] = self.request_peak_mb
+        report["request_peak_scope"] = "last request that ran with no other request in flight"
+        report["tracing"] = tracemalloc.is_tracing()
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            report["traced_current_mb"] = current / 2**20
+            report["traced_peak_mb"] = peak / 2**20
+            stats = tracemalloc.take_snapshot().statistics("filename")[:top]
+            report["top_allocations"] = [
+                {"file": stat.traceback[0].filename, "mb": stat.size / 2**20, "blocks": stat.count} for stat in stats
+            ]
+        return report
+
+    async def analyze(self, description: str, crop: Optional[str] = None, region: Optional[str] = None,
+                      symptoms: Optional[List[str]] = None, render_report: bool = True) -> Dict:
+        return self.analyze_sync(description, crop=crop, region=region, symptoms=symptoms, render_report=render_report)
+
+    def analyze_sync(self, description: str, crop: Optional[str] = None, region: Optional[str] = None,
+                     symptoms: Optional[List[str]] = None, render_report: bool = True) -> Dict:
+        """Identify the pest and build the response; synchronous, see TextAnalysisTool.analyze_sync."""
+        logger.info("Analyzing description: %s", description)
+        start_mb = self.start_request_trace()
         try:
-            text_result = await self.text_tool.analyze(description)
+            text_result = self.text_tool.analyze_sync(description, crop=crop, region=region, symptoms=symptoms)
             likely_pest = text_result.get("likely_pest")
             if not likely_pest:
                 return {
@@ -323,8 +966,19 @@ class AgroPestAgent:
                     "user_guidance": text_result["user_guidance"]
                 }
 
-            pest_data = self.knowledge_base.search(likely_pest).get(likely_pest, {})
-            report = self.generate_report(description, likely_pest, pest_data, text_result)
+            report_id = uuid.uuid4().hex
+            report_args = {
+                "description": description.strip() or ", ".join(symptoms),
+                "pest": likely_pest,
+                "confidence": text_result["pests"][0]["confidence"],
+                "kb_version": self.knowledge_base.version
+            }
+            if render_report:
+                report = self.knowledge_base.generate_report(report_id, **report_args)
+            else:
+                # Rendered on demand by KnowledgeBase.render_report(report_id), in whichever worker gets that request
+                report = ""
+                self.knowledge_base.save_report_args(report_id, report_args)
 
             chart = {
                 "type": "bar",
@@ -333,37 +987,23 @@ class AgroPestAgent:
                     "datasets": [{
                         "label": "Confidence",
                         "data": [p["confidence"] for p in text_result["pests"]],
-                        "backgroundColor": ["#4caf50", "#ff9800", "#f44336"],
-                        "borderColor": ["#388e3c", "#f57c00", "#d32f2f"],
-                        "borderWidth": 1
+                        **CHART_DATASET_STYLE
                     }]
                 },
-                "options": {
-                    "scales": {
-                        "y": {
-                            "beginAtZero": True,
-                            "title": {"display": True, "text": "Confidence Score"}
-                        },
-                        "x": {
-                            "title": {"display": True, "text": "Pest"}
-                        }
-                    },
-                    "plugins": {
-                        "title": {"display": True, "text": "Pest Identification Confidence"}
-                    }
-                }
+                "options": CHART_OPTIONS
             }
 
-            logger.info(f"Generated report for pest: {likely_pest}")
+            logger.info("Generated report for pest: %s", likely_pest)
             return {
                 "pest": likely_pest,
                 "report": report,
+                "report_id": report_id,
                 "text_result": text_result,
                 "chart": chart,
                 "user_guidance": text_result["user_guidance"]
             }
         except ValueError as e:
-            logger.error(f"Analysis failed: {str(e)}")
+            logger.error("Analysis failed: %s", e)
             return {
                 "pest": None,
                 "report": str(e),
@@ -372,31 +1012,30 @@ class AgroPestAgent:
                 "user_guidance": [str(e)]
             }
         except Exception as e:
-            logger.error(f"Unexpected error during analysis: {str(e)}")
+            logger.error("Unexpected error during analysis: %s", e)
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+        finally:
+            self.end_request_trace(start_mb)
 
-    def generate_report(self, description: str, pest: str, pest_data: Dict, text_result: Dict) -> str:
-        os.makedirs('reports', exist_ok=True)
-        report_id = str(uuid.uuid4()).replace('-', '')
-        report_path = f'reports/pest_report_{report_id}.txt'
+    def start_request_trace(self) -> float:
+        """Count a request in; reset the traced peak if it is the only one. Returns traced MB at start."""
+        with self.trace_lock:
+            self.requests_in_flight += 1
+            self.traced_alone = self.requests_in_flight == 1
+            if self.traced_alone and tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            return traced_mb()
 
-        report = f"Pest Identification Report\n\n"
-        report += f"Identified Pest: {pest}\n"
-        report += f"Description: {description}\n"
-        report += f"Confidence: {text_result['pests'][0]['confidence']:.2f}\n\n"
-        report += "Details:\n"
-        for key, value in pest_data.items():
-            if isinstance(value, dict):
-                report += f"  {key.replace('_', ' ').title()}:\n"
-                for sub_key, sub_value in value.items():
-                    report += f"    - {sub_key.replace('_', ' ').title()}: {sub_value}\n"
-            else:
-                report += f"  {key.replace('_', ' ').title()}: {value}\n"
+    def end_request_trace(self, start_mb: float):
+        """Count a request out, recording its peak if no other request overlapped it."""
+        with self.trace_lock:
+            if self.traced_alone and tracemalloc.is_tracing():
+                self.request_peak_mb = tracemalloc.get_traced_memory()[1] / 2**20 - start_mb
+            self.requests_in_flight -= 1
 
-        with open(report_path, 'w') as f:
-            f.write(report)
-        logger.info(f"Report saved to {report_path}")
-        return report
+# Trace allocations from startup so the memory report can attribute them
+if config.get('memory_tracing', False):
+    tracemalloc.start()
 
 # FastAPI App
 app = FastAPI()
@@ -410,31 +1049,238 @@ app.add_middleware(
 )
 
 class PestDescription(BaseModel):
-    description: str
+    description: str = ""
+    crop: Optional[str] = None
+    region: Optional[str] = None
+    symptoms: List[str] = []
 
 class PestResponse(BaseModel):
     pest: Optional[str]
     report: str
+    report_id: Optional[str] = None
     text_result: Dict
     chart: Dict
     user_guidance: List[str]
 
+class CompactPestResponse(BaseModel):
+    pest: Optional[str]
+    pests: List[Dict]
+
+# Fields a compact response keeps: the top pest and the scored candidates
+COMPACT_FIELDS = ["pest", "pests"]
+RESPONSE_FIELDS = ["pest", "report", "report_id", "text_result", "chart", "user_guidance", "pests"]
+
+def select_fields(result: Dict, fields: List[str]) -> Dict:
+    """Trim a full analysis result down to the requested top-level fields."""
+    selected = {}
+    for field in fields:
+        if field == "pests":
+            selected["pests"] = result["text_result"].get("pests", [])
+        else:
+            selected[field] = result.get(field)
+    return selected
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """Content codings of an Accept-Encoding header mapped to their q-values."""
+    encodings = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[coding.lower()] = q
+    return encodings
+
+def choose_encoding(header: str) -> Optional[str]:
+    """Preferred coding we can produce for the client: br over gzip on equal q, never one with q=0."""
+    encodings = accepted_encodings(header)
+    available = ["br", "gzip"] if brotli is not None else ["gzip"]
+    weights = {coding: encodings.get(coding, encodings.get("*", 0.0)) for coding in available}
+    best = max(available, key=lambda coding: weights[coding])
+    return best if weights[best] > 0 else None
+
+def json_response(request: Request, payload: Dict) -> Response:
+    """Serialize with orjson and compress large bodies the client accepts."""
+    body = orjson.dumps(payload)
+    headers = {}
+    if len(body) >= config.get('compression_min_size', 1024):
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+        if encoding == "br":
+            body = brotli.compress(body, quality=config.get('brotli_quality', 5))
+            headers["Content-Encoding"] = "br"
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=config.get('gzip_level', 6))
+            headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# One KB and one agent per worker process, so the model, KB and caches are loaded once.
+# The KB is built on its own so /suggest can serve it without loading the model.
+knowledge_base = None
+knowledge_base_lock = threading.Lock()
+agent = None
+agent_lock = threading.Lock()
+
+def get_knowledge_base() -> KnowledgeBase:
+    global knowledge_base
+    with knowledge_base_lock:
+        if knowledge_base is None:
+            knowledge_base = KnowledgeBase(config['knowledge_base_file'])
+    return knowledge_base
+
+def get_agent() -> AgroPestAgent:
+    global agent
+    with agent_lock:
+        if agent is None:
+            agent = AgroPestAgent(get_knowledge_base())
+    return agent
+
+async def analyze_in_threadpool(description: PestDescription, render_report: bool) -> Dict:
+    """Run AgroPestAgent.analyze on a worker thread; scoring is CPU-bound and would stall the event loop."""
+    return await run_in_threadpool(lambda: get_agent().analyze_sync(
+        description.description, crop=description.crop, region=description.region,
+        symptoms=description.symptoms, render_report=render_report))
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "timestamp": str(uuid.uuid1())}
 
-@app.post("/identify-pest", response_model=PestResponse)
-async def identify_pest(description: PestDescription):
+@app.get("/suggest")
+async def suggest(q: str = "", limit: int = Query(8, ge=1, le=10)):
+    return {"query": q, "suggestions": get_knowledge_base().suggestions.search(q, limit) if q.strip() else []}
+
+@app.get("/reports/{report_id}", response_class=PlainTextResponse)
+async def get_report(report_id: str):
+    # Rendering needs only the KB (not the model) and does file I/O, so it runs on the thread pool
+    report = await run_in_threadpool(lambda: get_knowledge_base().render_report(report_id))
+    if report is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return report
+
+@app.get("/debug/memory")
+async def memory_report():
+    # Only exposed when memory_tracing is on; the snapshot is slow and lists source paths
+    if not config.get('memory_tracing', False):
+        raise HTTPException(status_code=404, detail="Not Found")
+    return await run_in_threadpool(lambda: get_agent().memory_report())
+
+# The body is built by json_response and its shape depends on compact/fields,
+# so the models only document it
+@app.post("/identify-pest", response_class=Response, responses={
+    200: {"model": Union[PestResponse, CompactPestResponse],
+          "description": "Full result, the compact shape (compact=true), or only the top-level fields named in fields"}
+})
+async def identify_pest(description: PestDescription, request: Request,
+                        fields: Optional[str] = None, compact: bool = False,
+                        full_report: Optional[bool] = None):
+    selected_fields = None
+    if compact:
+        selected_fields = COMPACT_FIELDS
+    elif fields:
+        selected_fields = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in selected_fields if f not in RESPONSE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
     request_id = str(uuid.uuid4())
-    logger.info(f"Processing request {request_id}")
+    token = request_id_var.set(request_id)
+    logger.info("Processing request %s", request_id)
     try:
-        agent = AgroPestAgent()
-        result = await agent.analyze(description.description)
-        logger.info(f"Request {request_id} processed successfully")
-        return result
+        if full_report is None:
+            full_report = not config.get('lazy_reports', False)
+        result = await analyze_in_threadpool(description, full_report)
+        logger.info("Request %s processed successfully", request_id)
+        if selected_fields:
+            result = select_fields(result, selected_fields)
+        return json_response(request, result)
     except Exception as e:
-        logger.error(f"Request {request_id} failed: {str(e)}")
+        logger.error("Request %s failed: %s", request_id, e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        request_id_var.reset(token)
+
+@app.websocket("/ws")
+async def identify_pest_ws(websocket: WebSocket):
+    """Persistent channel: clients send {"id", "description", ...} and get staged {"id", "status"} updates.
+
+    Messages take the /identify-pest body fields plus optional "compact" and
+    "full_report" flags.
+
+    Requests on a connection are processed in order by one worker, with the
+    scoring itself on the thread pool so other sockets and HTTP requests keep
+    being served; at most ws_max_pending may wait, further ones are rejected
+    until results drain. Binary frames are answered with an error.
+    """
+    await websocket.accept()
+    pending = asyncio.Queue(maxsize=config.get('ws_max_pending', 8))
+    send_lock = asyncio.Lock()
+
+    async def send(message: Dict):
+        async with send_lock:
+            await websocket.send_text(orjson.dumps(message).decode())
+
+    async def worker():
+        while True:
+            client_id, request, compact, full_report = await pending.get()
+            request_id = str(uuid.uuid4())
+            token = request_id_var.set(request_id)
+            logger.info("Processing request %s (websocket id %s)", request_id, client_id)
+            try:
+                await send({"id": client_id, "status": "processing"})
+                result = await analyze_in_threadpool(request, full_report)
+                if compact:
+                    result = select_fields(result, COMPACT_FIELDS)
+                await send({"id": client_id, "status": "done", "result": result})
+                logger.info("Request %s processed successfully", request_id)
+            except Exception as e:
+                logger.error("Request %s failed: %s", request_id, e)
+                try:
+                    await send({"id": client_id, "status": "error", "error": str(e)})
+                except Exception as send_error:
+                    # The socket is gone; the receive loop will see the disconnect and stop this worker
+                    logger.warning("Could not report failure of request %s: %s", request_id, send_error)
+            finally:
+                request_id_var.reset(token)
+                pending.task_done()
+
+    worker_task = asyncio.create_task(worker())
+    try:
+        while True:
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            text = frame.get("text")
+            if text is None:
+                await send({"id": None, "status": "error", "error": "Invalid request: only text frames are accepted"})
+                continue
+            client_id = None
+            try:
+                message = json.loads(text)
+                client_id = message.get("id")
+                request = PestDescription(**message)
+            except (ValueError, AttributeError, TypeError) as e:
+                await send({"id": client_id, "status": "error", "error": f"Invalid request: {e}"})
+                continue
+            try:
+                full_report = message.get("full_report", not config.get('lazy_reports', False))
+                pending.put_nowait((client_id, request, bool(message.get("compact")), bool(full_report)))
+            except asyncio.QueueFull:
+                await send({"id": client_id, "status": "rejected",
+                            "error": "Too many pending requests; wait for results before sending more."})
+                continue
+            await send({"id": client_id, "status": "queued", "pending": pending.qsize()})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        logger.info("WebSocket client disconnected")
+        worker_task.cancel()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file